@@ -0,0 +1,242 @@
+# analytics.py
+# incrementally maintained energy aggregates served to the dashboard
+#
+# Every logged reading updates running sums in O(1): per-classroom totals and
+# fixed-size time-bucketed series (1h / 1d, per classroom and campus-wide).
+# Bucket counts are capped, so summary and series queries cost the same no
+# matter how much history the server has seen. EnergyLog keeps the most recent
+# raw rows in a columnar numpy ring buffer for /energy_history. All access goes
+# through a lock because Flask's dev server handles requests on many threads.
+import math
+import threading
+import numpy as np
+
+RESOLUTIONS = {"1h": 3600, "1d": 86400}
+MAX_BUCKETS = {"1h": 24 * 31, "1d": 2 * 366}  # ~1 month hourly, ~2 years daily
+CAMPUS = None  # series key for campus-wide buckets
+
+
+def _new_totals():
+    return {"readings": 0, "total_kwh": 0.0, "solar_kwh": 0.0, "solar_readings": 0,
+            "predicted_sum": 0.0, "actual_sum": 0.0, "abs_err_sum": 0.0}
+
+
+def _accumulate(t, predicted, actual, total_kwh, use_solar):
+    t['readings'] += 1
+    t['total_kwh'] += total_kwh
+    t['predicted_sum'] += predicted
+    t['actual_sum'] += actual
+    t['abs_err_sum'] += abs(predicted - actual)
+    if use_solar:
+        t['solar_readings'] += 1
+        t['solar_kwh'] += total_kwh
+
+
+def _merge(dst, src):
+    for k, v in src.items():
+        dst[k] += v
+    return dst
+
+
+def _group_sums(inv, ngroups, per_row):
+    """Per-group running sums (list of totals dicts) from per-row arrays."""
+    inv = np.asarray(inv).reshape(-1)
+    sums = {k: np.bincount(inv, weights=v, minlength=ngroups) for k, v in per_row.items()}
+    return [{k: (int(v[g]) if k in ("readings", "solar_readings") else float(v[g]))
+             for k, v in sums.items()} for g in range(ngroups)]
+
+
+def _summarize(t):
+    """Running sums -> small JSON-ready dict."""
+    n = t['readings']
+    return {
+        "readings": n,
+        "total_kwh": round(t['total_kwh'], 3),
+        "avg_predicted": round(t['predicted_sum'] / n, 2) if n else 0.0,
+        "avg_actual": round(t['actual_sum'] / n, 2) if n else 0.0,
+        "mae": round(t['abs_err_sum'] / n, 3) if n else 0.0,
+        # share of readings powered from solar, and of energy drawn while on solar
+        "solar_pct": round(100 * t['solar_readings'] / n, 2) if n else 0.0,
+        "solar_kwh_pct": round(100 * t['solar_kwh'] / t['total_kwh'], 2) if t['total_kwh'] else 0.0,
+    }
+
+
+def _iso(seconds):
+    return str(np.datetime64(int(seconds), "s"))
+
+
+class EnergyAggregates:
+    """Running per-classroom / campus totals and bounded time-bucketed series."""
+
+    def __init__(self, max_buckets=None):
+        self.max_buckets = dict(MAX_BUCKETS, **(max_buckets or {}))
+        self.totals = {}  # {classroom: running sums}
+        # {resolution: {classroom or CAMPUS: {bucket_start_seconds: running sums}}}
+        self.series = {res: {} for res in RESOLUTIONS}
+        self._lock = threading.Lock()
+
+    def add(self, classroom, ts_seconds, predicted, actual, total_kwh, use_solar):
+        """Fold one logged reading into every aggregate."""
+        with self._lock:
+            self._add(classroom, ts_seconds, predicted, actual, total_kwh, use_solar)
+
+    def _add(self, classroom, ts_seconds, predicted, actual, total_kwh, use_solar):
+        if classroom not in self.totals:
+            self.totals[classroom] = _new_totals()
+        _accumulate(self.totals[classroom], predicted, actual, total_kwh, use_solar)
+
+        for res, width in RESOLUTIONS.items():
+            start = int(ts_seconds) // width * width
+            for key in (classroom, CAMPUS):
+                t = self._bucket(res, key, start)
+                if t is not None:
+                    _accumulate(t, predicted, actual, total_kwh, use_solar)
+
+    def _bucket(self, res, key, start):
+        """Running sums of one bucket, or None if it is older than the retained window."""
+        buckets = self.series[res].setdefault(key, {})
+        if start not in buckets:
+            buckets[start] = _new_totals()
+            if len(buckets) > self.max_buckets[res]:
+                del buckets[min(buckets)]
+        return buckets.get(start)
+
+    def add_batch(self, classroom, ts_seconds, predicted, actual, total_kwh, use_solar):
+        """
+        Fold equal-length arrays of readings into every aggregate (binary /update).
+        Sums are formed per (classroom, bucket) group with numpy, so Python work
+        scales with the groups a batch touches rather than with its readings.
+        """
+        predicted = np.asarray(predicted, dtype=float)
+        actual = np.asarray(actual, dtype=float)
+        total_kwh = np.asarray(total_kwh, dtype=float)
+        solar = np.asarray(use_solar, dtype=bool)
+        per_row = {"readings": np.ones(len(total_kwh)), "total_kwh": total_kwh,
+                   "solar_kwh": np.where(solar, total_kwh, 0.0),
+                   "solar_readings": solar.astype(float),
+                   "predicted_sum": predicted, "actual_sum": actual,
+                   "abs_err_sum": np.abs(predicted - actual)}
+        names, codes = np.unique(np.asarray(classroom, dtype=object), return_inverse=True)
+        codes = codes.reshape(-1)
+        ts_seconds = np.asarray(ts_seconds, dtype=np.int64)
+
+        with self._lock:
+            for name, t in zip(names, _group_sums(codes, len(names), per_row)):
+                if name not in self.totals:
+                    self.totals[name] = _new_totals()
+                _merge(self.totals[name], t)
+
+            for res, width in RESOLUTIONS.items():
+                starts, sidx = np.unique(ts_seconds // width * width, return_inverse=True)
+                sidx = sidx.reshape(-1)
+                for start, t in zip(starts, _group_sums(sidx, len(starts), per_row)):
+                    bucket = self._bucket(res, CAMPUS, int(start))
+                    if bucket is not None:
+                        _merge(bucket, t)
+                pairs, pinv = np.unique(codes * len(starts) + sidx, return_inverse=True)
+                for pair, t in zip(pairs, _group_sums(pinv, len(pairs), per_row)):
+                    bucket = self._bucket(res, names[pair // len(starts)], int(starts[pair % len(starts)]))
+                    if bucket is not None:
+                        _merge(bucket, t)
+
+    def summary(self):
+        """Campus totals plus one row per classroom, largest consumer first."""
+        with self._lock:
+            totals = {cls: dict(t) for cls, t in self.totals.items()}
+        campus = _new_totals()
+        rows = []
+        for cls, t in totals.items():
+            _merge(campus, t)
+            rows.append(dict(classroom=cls, **_summarize(t)))
+        rows.sort(key=lambda r: r['total_kwh'], reverse=True)
+        return {"campus": _summarize(campus), "classrooms": rows}
+
+    def series_for(self, resolution="1h", classroom=CAMPUS, max_points=200):
+        """
+        Energy / occupancy series at the given resolution, oldest first.
+        When the retained span needs more than max_points buckets, buckets are
+        merged into epoch-aligned windows of `step` buckets each, so every point
+        covers one contiguous span of time and never exceeds max_points entries.
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"unknown resolution '{resolution}', expected one of {list(RESOLUTIONS)}")
+        width = RESOLUTIONS[resolution]
+        max_points = max(1, max_points)
+        with self._lock:
+            buckets = {s: dict(t) for s, t in self.series[resolution].get(classroom, {}).items()}
+        starts = sorted(buckets)
+        step = 1
+        if starts:
+            step = max(1, math.ceil((starts[-1] - starts[0] + width) / width / max_points))
+            # alignment can straddle one extra window; widen until it fits
+            while starts[-1] // (width * step) - starts[0] // (width * step) + 1 > max_points:
+                step += 1
+        window = width * step
+
+        windows = {}
+        for s in starts:
+            key = s // window * window
+            if key not in windows:
+                windows[key] = _new_totals()
+            _merge(windows[key], buckets[s])
+        points = []
+        for key, t in windows.items():
+            n = t['readings']
+            points.append({
+                "timestamp": _iso(key),
+                "total_kwh": round(t['total_kwh'], 3),
+                "predicted": round(t['predicted_sum'] / n, 2) if n else 0.0,
+                "actual": round(t['actual_sum'] / n, 2) if n else 0.0,
+                "mae": round(t['abs_err_sum'] / n, 3) if n else 0.0,
+                "readings": n,
+            })
+        return {"resolution": resolution, "classroom": classroom,
+                "bucket_seconds": window, "points": points}
+
+
+class EnergyLog:
+    """Fixed-size columnar ring buffer of the most recent energy log rows."""
+
+    DTYPE = np.dtype([
+        ("timestamp", "<i8"),    # wall-clock epoch seconds
+        ("classroom", "O"),
+        ("predicted", "<i8"),
+        ("actual", "<i8"),
+        ("lights_kwh", "<f8"),
+        ("fan_kwh", "<f8"),
+        ("ac_kwh", "<f8"),
+        ("total_kwh", "<f8"),
+        ("use_solar", "?"),
+    ])
+
+    def __init__(self, size=200):
+        self.size = size
+        self.rows = np.zeros(size, dtype=self.DTYPE)
+        self.count = 0  # rows ever appended
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def append(self, columns):
+        """Append {field: equal-length array}; only the newest `size` rows are kept."""
+        n = len(columns['timestamp'])
+        keep = min(n, self.size)
+        with self._lock:
+            pos = (self.count + n - keep + np.arange(keep)) % self.size
+            for name in self.DTYPE.names:
+                self.rows[name][pos] = np.asarray(columns[name])[n - keep:]
+            self.count += n
+
+    def tail(self, limit):
+        """Last `limit` rows, oldest first, as JSON-ready dicts."""
+        with self._lock:
+            k = max(0, min(limit, self.count, self.size))
+            rows = self.rows[(self.count - k + np.arange(k)) % self.size]
+        timestamps = np.datetime_as_string(rows['timestamp'].astype("datetime64[s]"), unit="s")
+        return [{"timestamp": str(ts), "classroom": r['classroom'],
+                 "predicted": int(r['predicted']), "actual": int(r['actual']),
+                 "lights_kwh": float(r['lights_kwh']), "fan_kwh": float(r['fan_kwh']),
+                 "ac_kwh": float(r['ac_kwh']), "total_kwh": float(r['total_kwh']),
+                 "use_solar": bool(r['use_solar'])}
+                for ts, r in zip(timestamps, rows)]
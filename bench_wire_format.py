@@ -0,0 +1,100 @@
+# bench_wire_format.py
+# bytes and CPU per reading for JSON vs binary record vs columnar batch /update
+#
+# Gateway side times encoding a payload; server side times the whole /update
+# handler through Flask's test client (request parsing, features, prediction,
+# control, history/energy logging, response) with the model replaced by a stub
+# so only ingestion cost is measured. CPU is process time per reading.
+import argparse, contextlib, io, json, time
+import numpy as np
+import wire_format as wf
+
+
+def synthetic_readings(n, num_classrooms=4):
+    rng = np.random.default_rng(0)
+    start = np.datetime64("2025-10-01T00:00:00", "s")
+    readings = []
+    for i in range(n):
+        occ = int(rng.poisson(12))
+        readings.append({
+            "timestamp": str(start + np.timedelta64(3600 * (i // num_classrooms), "s")),
+            "classroom": f"class_{i % num_classrooms}",
+            "is_holiday": 0,
+            "scheduled": int(rng.random() < 0.4),
+            "occupancy": occ,
+            "motion": int(occ > 0),
+            "temp": round(25 + 0.06 * occ + rng.uniform(-0.5, 0.5), 2),
+            "co2": round(410 + 8 * occ + rng.uniform(-10, 10), 1),
+            "solar_kw": round(3.0 * rng.random(), 3),
+            "battery_soc": round(rng.random(), 3),
+        })
+    return readings
+
+
+class _StubModel:
+    """Stands in for the RF so the benchmark measures ingestion, not inference."""
+    def predict(self, X):
+        return np.zeros(len(X))
+
+
+def cpu_us_per_reading(fn, n, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.process_time()
+        fn()
+        best = min(best, time.process_time() - t0)
+    return best / n * 1e6
+
+
+def run(n=4000, batch_size=256, binary_reply=True):
+    import model_server
+    model_server.rf, model_server.scaler_rf = _StubModel(), None
+    client = model_server.app.test_client()
+
+    readings = synthetic_readings(n)
+    batches = [readings[i:i + batch_size] for i in range(0, n, batch_size)]
+    json_bodies = [json.dumps(r).encode() for r in readings]
+    record_bodies = [wf.encode_readings([r], wf.CONTENT_TYPE_RECORD) for r in readings]
+    batch_bodies = [wf.encode_readings(b, wf.CONTENT_TYPE_BATCH) for b in batches]
+
+    def post_all(bodies, content_type):
+        headers = {"Content-Type": content_type}
+        if binary_reply and content_type != wf.CONTENT_TYPE_JSON:
+            headers["Accept"] = content_type
+        for body in bodies:
+            client.post("/update", data=body, headers=headers)
+
+    formats = [
+        ("json", wf.CONTENT_TYPE_JSON, json_bodies,
+         lambda: [json.dumps(r).encode() for r in readings],
+         lambda: [json.loads(b).copy() for b in json_bodies]),
+        ("record", wf.CONTENT_TYPE_RECORD, record_bodies,
+         lambda: [wf.encode_readings([r], wf.CONTENT_TYPE_RECORD) for r in readings],
+         lambda: [wf.decode_readings(b, wf.CONTENT_TYPE_RECORD) for b in record_bodies]),
+        (f"batch[{batch_size}]", wf.CONTENT_TYPE_BATCH, batch_bodies,
+         lambda: [wf.encode_readings(b, wf.CONTENT_TYPE_BATCH) for b in batches],
+         lambda: [wf.decode_readings(b, wf.CONTENT_TYPE_BATCH) for b in batch_bodies]),
+    ]
+
+    rows = []
+    for name, content_type, bodies, encode, decode in formats:
+        with contextlib.redirect_stdout(io.StringIO()):  # the handlers log every prediction
+            handler_us = cpu_us_per_reading(lambda: post_all(bodies, content_type), n)
+        rows.append((name, sum(map(len, bodies)) / n,
+                     cpu_us_per_reading(encode, n), cpu_us_per_reading(decode, n), handler_us))
+
+    print(f"{n} readings, batch size {batch_size}, "
+          f"{'binary' if binary_reply else 'JSON'} replies to binary requests")
+    print(f"{'format':<12}{'bytes/reading':>15}{'encode us':>12}{'decode us':>12}{'/update us':>13}")
+    for name, nbytes, enc_us, dec_us, handler_us in rows:
+        print(f"{name:<12}{nbytes:>15.1f}{enc_us:>12.2f}{dec_us:>12.2f}{handler_us:>13.1f}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wire format size/CPU benchmark")
+    parser.add_argument("--n", type=int, default=4000, help="number of readings")
+    parser.add_argument("--batch", type=int, default=256, help="readings per columnar batch")
+    parser.add_argument("--json-reply", action="store_true", help="ask for JSON replies to binary requests")
+    args = parser.parse_args()
+    run(n=args.n, batch_size=args.batch, binary_reply=not args.json_reply)
@@ -1,11 +1,24 @@
 # control.py
 # rule-based controller and energy calc
+import numpy as np
+
+# controller tuning shared by rule_based_control and rule_based_control_batch
+LIGHTS_KW = 0.2            # 200W when ON
+FAN_KW = 0.075             # 75W single fan
+LIGHTS_MIN_OCC = 1         # lights ON if predicted occupancy >= this
+FAN_MIN_OCC = 3            # fans ON if occupancy >= this
+AC_MIN_OCC = 10            # AC ON if occupancy >= this ...
+AC_MAX_TEMP = 26           # ... or temperature above this
+AC_BASE_KW = 1.2           # AC power: base kW ...
+AC_KW_PER_PERSON = 0.005   # ... plus this per occupant
+SOLAR_MIN_SOC = 0.2        # prefer solar while battery SOC is above this
+
 def compute_energy(devices):
     # devices: dict like {"lights":1,"fan":1,"ac":1,"ac_power_kw":0.8}
     # return energy per hour in kWh (approx)
     energies = {}
-    energies['lights_kwh'] = 0.2 * devices.get('lights',0) # 200W when ON
-    energies['fan_kwh'] = 0.075 * devices.get('fan',0)     # 75W single fan
+    energies['lights_kwh'] = LIGHTS_KW * devices.get('lights',0)
+    energies['fan_kwh'] = FAN_KW * devices.get('fan',0)
     energies['ac_kwh'] = devices.get('ac_power_kw', 0) if devices.get('ac',0) else 0.0
     total = sum(energies.values())
     energies['total_kwh'] = round(total,4)
@@ -20,21 +33,40 @@ def rule_based_control(state, predicted_occupancy):
     devices = {"lights":0,"fan":0,"ac":0,"ac_power_kw":0.0}
     occ = predicted_occupancy if predicted_occupancy is not None else state.get('occupancy',0)
     # lights: ON if predicted occupancy > 0
-    devices['lights'] = 1 if occ >= 1 else 0
-    # fans: ON if occupancy >= 3
-    devices['fan'] = 1 if occ >= 3 else 0
-    # AC: use if occ >= 10 or temp > 26
-    if occ >= 10 or state.get('temp',25) > 26:
+    devices['lights'] = 1 if occ >= LIGHTS_MIN_OCC else 0
+    # fans: ON if occupancy >= FAN_MIN_OCC
+    devices['fan'] = 1 if occ >= FAN_MIN_OCC else 0
+    # AC: use if occ >= AC_MIN_OCC or temp > AC_MAX_TEMP
+    if occ >= AC_MIN_OCC or state.get('temp',25) > AC_MAX_TEMP:
         devices['ac'] = 1
-        # AC power adjust by occupancy: base 1.2 kW, scale a bit
-        devices['ac_power_kw'] = round(1.2 + 0.005*occ,3)
+        # AC power adjust by occupancy: base AC_BASE_KW, scale a bit
+        devices['ac_power_kw'] = round(AC_BASE_KW + AC_KW_PER_PERSON*occ,3)
     else:
         devices['ac'] = 0
         devices['ac_power_kw'] = 0.0
     # energy source decision simple:
-    # If solar_kw > total_kwh and battery_soc>0.2 prefer solar
+    # If solar_kw >= total_kwh or battery_soc > SOLAR_MIN_SOC prefer solar
     energy = compute_energy(devices)
     use_solar = False
-    if state.get('solar_kw',0) >= energy['total_kwh'] or state.get('battery_soc',0) > 0.2:
+    if state.get('solar_kw',0) >= energy['total_kwh'] or state.get('battery_soc',0) > SOLAR_MIN_SOC:
         use_solar = True
     return {"devices":devices, "energy": energy, "use_solar": use_solar}
+
+def rule_based_control_batch(temp, solar_kw, battery_soc, predicted_occupancy):
+    """
+    Vectorised rule_based_control over arrays of readings (binary /update path).
+    returns: dict of equal-length arrays -- device actions, energy and use_solar
+    """
+    occ = np.asarray(predicted_occupancy)
+    lights = (occ >= LIGHTS_MIN_OCC).astype(np.uint8)
+    fan = (occ >= FAN_MIN_OCC).astype(np.uint8)
+    ac = ((occ >= AC_MIN_OCC) | (np.asarray(temp) > AC_MAX_TEMP)).astype(np.uint8)
+    ac_power_kw = np.where(ac == 1, np.round(AC_BASE_KW + AC_KW_PER_PERSON*occ, 3), 0.0)
+    lights_kwh = LIGHTS_KW * lights
+    fan_kwh = FAN_KW * fan
+    ac_kwh = np.where(ac == 1, ac_power_kw, 0.0)
+    total_kwh = np.round(lights_kwh + fan_kwh + ac_kwh, 4)
+    use_solar = (np.asarray(solar_kw) >= total_kwh) | (np.asarray(battery_soc) > SOLAR_MIN_SOC)
+    return {"lights": lights, "fan": fan, "ac": ac, "ac_power_kw": ac_power_kw,
+            "lights_kwh": lights_kwh, "fan_kwh": fan_kwh, "ac_kwh": ac_kwh,
+            "total_kwh": total_kwh, "use_solar": use_solar.astype(np.uint8)}
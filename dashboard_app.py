@@ -45,19 +45,38 @@ def get_status():
     except Exception:
         return {}
 
-def get_energy_history():
+def get_energy_history(limit=10):
     try:
-        r = requests.get(SERVER + "/energy_history", timeout=4)
+        r = requests.get(SERVER + "/energy_history", params={"limit": limit}, timeout=4)
         r.raise_for_status()
         return pd.DataFrame(r.json())
     except Exception:
         return pd.DataFrame()
 
+def get_analytics_summary():
+    # campus + per-classroom aggregates maintained incrementally by the server
+    try:
+        r = requests.get(SERVER + "/analytics/summary", timeout=3)
+        r.raise_for_status()
+        return r.json()
+    except Exception:
+        return {}
+
+def get_analytics_series(resolution="1h", max_points=150):
+    try:
+        r = requests.get(SERVER + "/analytics/series",
+                         params={"resolution": resolution, "max_points": max_points}, timeout=3)
+        r.raise_for_status()
+        return pd.DataFrame(r.json().get("points", []))
+    except Exception:
+        return pd.DataFrame()
+
 # ---------- Layout ----------
 tab1, tab2, tab3 = st.tabs(["📊 Occupancy Overview", "⚡ Energy Efficiency", "🧭 3D Classroom"])
 
 refresh_interval = st.sidebar.slider("⏱️ Auto-refresh interval (seconds)", 2, 10, 3)
 pause = st.sidebar.checkbox("Pause Auto-Refresh", False)
+resolution = st.sidebar.radio("📅 Energy trend resolution", ["1h", "1d"], horizontal=True)
 # path to the 3D html file (resolve relative to this script)
 HTML_3D_FN = os.path.join(os.path.dirname(__file__), "classroom_3d.html")
 
@@ -70,7 +89,9 @@ should_rerun = (not pause) and (now_ts - st.session_state["last_refresh"] >= ref
 
 # Fetch data once per run
 status = get_status()
-eh = get_energy_history()
+summary = get_analytics_summary()
+series = get_analytics_series(resolution)
+eh = get_energy_history(limit=10)
 
 # ---------- TAB 1: OCCUPANCY OVERVIEW ----------
 with tab1:
@@ -113,37 +134,34 @@ with tab1:
 # ---------- TAB 2: ENERGY EFFICIENCY ----------
 with tab2:
     st.subheader("Energy Usage & Source Insights")
-    if not eh.empty:
-        # defensive checks
-        if 'total_kwh' not in eh.columns:
-            st.error("Energy history has unexpected format (missing total_kwh).")
-        else:
-            total_energy = round(eh['total_kwh'].sum(), 3)
-            avg_pred = round(eh['predicted'].mean(), 2) if 'predicted' in eh.columns else 0.0
-            try:
-                solar_used = eh['use_solar'].astype(int).sum() if 'use_solar' in eh.columns else 0
-                solar_pct = round(100 * solar_used / len(eh), 2) if len(eh) else 0.0
-            except Exception:
-                solar_pct = 0.0
-
-            c1, c2, c3 = st.columns(3)
-            c1.metric("🔋 Total Energy Used (kWh)", total_energy)
-            c2.metric("👥 Avg Predicted Occupancy", avg_pred)
-            c3.metric("☀️ Solar Energy Utilization", f"{solar_pct}%")
-
-            st.markdown("### 📈 Energy Trends")
-            tmp = eh.tail(150)
+    campus = summary.get('campus', {})
+    if campus.get('readings'):
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("🔋 Total Energy Used (kWh)", campus.get('total_kwh', 0.0))
+        c2.metric("👥 Avg Predicted Occupancy", campus.get('avg_predicted', 0.0))
+        c3.metric("☀️ Solar Energy Utilization", f"{campus.get('solar_pct', 0.0)}%")
+        c4.metric("🎯 Prediction MAE", campus.get('mae', 0.0))
+
+        st.markdown(f"### 📈 Energy Trends ({resolution} buckets)")
+        if not series.empty:
+            trend = series.set_index('timestamp')
             try:
-                st.line_chart(tmp[['predicted', 'actual']], use_container_width=True)
+                st.line_chart(trend[['predicted', 'actual']], use_container_width=True)
+                st.bar_chart(trend[['total_kwh']], use_container_width=True)
             except Exception:
-                st.write("Chart unavailable: check energy history shape.")
+                st.write("Chart unavailable: check analytics series shape.")
+        else:
+            st.write("No trend data yet.")
 
-            st.markdown("### 🧾 Per-Classroom Summary")
-            agg = eh.groupby('classroom')[['total_kwh']].sum().reset_index().sort_values('total_kwh', ascending=False)
-            st.dataframe(agg, use_container_width=True)
+        st.markdown("### 🧾 Per-Classroom Summary")
+        agg = pd.DataFrame(summary.get('classrooms', []))
+        if not agg.empty:
+            agg = agg[['classroom', 'total_kwh', 'avg_predicted', 'avg_actual', 'mae', 'solar_pct', 'readings']]
+        st.dataframe(agg, use_container_width=True)
 
-            st.markdown("### 🔍 Latest Records")
-            st.dataframe(eh.tail(10).sort_values('timestamp', ascending=False), use_container_width=True)
+        st.markdown("### 🔍 Latest Records")
+        if not eh.empty:
+            st.dataframe(eh.sort_values('timestamp', ascending=False), use_container_width=True)
     else:
         st.info("Energy data not available yet. Run the simulator to start streaming data.")
 
@@ -6,8 +6,9 @@ import joblib
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from control import rule_based_control
-from tensorflow.keras.models import load_model
+from control import rule_based_control, rule_based_control_batch
+import wire_format
+from analytics import EnergyAggregates, EnergyLog
 
 app = Flask("smart_brain")
 CORS(app)
@@ -25,6 +26,7 @@ scaler_lstm_path = os.path.join(MODELS_DIR, "scaler_lstm.joblib")
 
 if os.path.exists(lstm_path) and os.path.exists(scaler_lstm_path):
     try:
+        from tensorflow.keras.models import load_model  # optional: only needed for the LSTM
         lstm = load_model(lstm_path)
         scaler_lstm = joblib.load(scaler_lstm_path)
         print("✅ LSTM model and scaler loaded successfully.")
@@ -49,7 +51,12 @@ else:
 
 # ------------------ In-memory state ------------------
 LATEST = {}          # {classroom: {...}}
-ENERGY_HISTORY = []  # list of dicts for dashboard plots
+ENERGY_HISTORY = EnergyLog(size=200)  # columnar ring buffer of the latest energy rows
+AGGREGATES = EnergyAggregates()  # running totals / bucketed series for /analytics
+
+# model input order shared by the RF, LSTM and binary batch paths (see train_model.prepare)
+FEATURE_COLS = ['hour', 'dow', 'is_holiday', 'scheduled', 'occ_lag1',
+                'motion', 'temp', 'co2', 'solar_kw']
 
 
 # ------------------ Helper: LSTM preprocessing ------------------
@@ -62,9 +69,7 @@ def preprocess_seq_for_lstm(classroom):
     if len(hist) < 6:
         return None  # need at least 6 past steps
 
-    cols = ['hour', 'dow', 'is_holiday', 'scheduled', 'occ_lag1',
-            'motion', 'temp', 'co2', 'solar_kw']
-    arr = [[r.get(c, 0) for c in cols] for r in hist[-6:]]
+    arr = [[r.get(c, 0) for c in FEATURE_COLS] for r in hist[-6:]]
     seq = np.array(arr)
 
     if scaler_lstm:
@@ -79,14 +84,139 @@ def preprocess_seq_for_lstm(classroom):
 # ------------------ Helper: RF preprocessing ------------------
 def make_rf_features(rec):
     """Extract feature vector for Random Forest prediction."""
-    cols = ['hour', 'dow', 'is_holiday', 'scheduled', 'occ_lag1',
-            'motion', 'temp', 'co2', 'solar_kw']
-    return np.array([rec.get(c, 0) for c in cols]).reshape(1, -1)
+    return np.array([rec.get(c, 0) for c in FEATURE_COLS]).reshape(1, -1)
+
+
+# ------------------ Helper: binary ingestion ------------------
+def _history_features(cls, n):
+    """Feature rows of the last n stored readings of a classroom."""
+    hist = LATEST.get(cls, {}).get('history', [])[-n:] if n > 0 else []
+    return np.array([[r.get(c, 0) for c in FEATURE_COLS] for r in hist], dtype=float).reshape(-1, len(FEATURE_COLS))
+
+
+def _predict_batch(X, groups):
+    """Predict occupancy for every row of X; groups maps classroom -> row indices."""
+    n = len(X)
+    if rf is not None:
+        Xs = scaler_rf.transform(X) if scaler_rf else X
+        return np.maximum(0, np.rint(rf.predict(Xs))).astype(np.int64)
+
+    pred = np.zeros(n, dtype=np.int64)
+    if lstm is None:
+        print(f"⚠️ No model available. Returning 0 for {n} readings.")
+        return pred
+
+    # sliding 6-step windows over stored history + this batch, one predict call
+    windows, rows = [], []
+    for cls, idx in groups.items():
+        full = np.vstack([_history_features(cls, 5), X[idx]])
+        offset = len(full) - len(idx)
+        for k, i in enumerate(idx):
+            end = offset + k + 1
+            if end >= 6:
+                windows.append(full[end - 6:end])
+                rows.append(i)
+    if not windows:
+        print("⚠️ Not enough history for LSTM (need 6 timesteps).")
+        return pred
+    seq = np.stack(windows)
+    if scaler_lstm:
+        seq = scaler_lstm.transform(seq.reshape(-1, seq.shape[-1])).reshape(seq.shape)
+    p = lstm.predict(seq)[:, 0]
+    pred[rows] = np.maximum(0, np.rint(p)).astype(np.int64)
+    return pred
+
+
+def update_binary():
+    """
+    /update for wire_format bodies (single record or columnar batch).
+    Readings are decoded straight into a feature matrix and the controller, energy
+    log and aggregates all work on columns; a batch must be in time order per
+    classroom. Only the trailing readings kept in per-classroom history (and a
+    JSON reply, if the client asks for one) are turned into dicts.
+    """
+    try:
+        cols = wire_format.decode_readings(request.get_data(), request.mimetype)
+        names, codes = np.unique(cols['classroom'], return_inverse=True)
+        names = [b.decode("ascii") for b in names]
+    except ValueError as e:  # includes UnicodeDecodeError for non-ascii classroom ids
+        return jsonify({"error": str(e)}), 400
+
+    n = len(cols['timestamp'])
+    secs = cols['timestamp']
+    groups = {cls: np.flatnonzero(codes == k) for k, cls in enumerate(names)}
+    occupancy = cols['occupancy'].astype(np.int64)
+
+    # occ_lag1: previous reading of the same classroom, within the batch or from history
+    occ_lag1 = np.zeros(n, dtype=np.int64)
+    for cls, idx in groups.items():
+        hist = LATEST.get(cls, {}).get('history', [])
+        occ_lag1[idx[0]] = hist[-1]['occupancy'] if hist else 0
+        occ_lag1[idx[1:]] = occupancy[idx[:-1]]
+
+    hour = (secs // 3600) % 24
+    dow = (secs // 86400 + 3) % 7  # 1970-01-01 was a Thursday
+    derived = {"hour": hour, "dow": dow, "occ_lag1": occ_lag1}
+    X = np.empty((n, len(FEATURE_COLS)))
+    for j, c in enumerate(FEATURE_COLS):
+        X[:, j] = derived[c] if c in derived else cols[c]
+
+    # ---------------- Prediction ----------------
+    try:
+        pred = _predict_batch(X, groups)
+    except Exception as e:
+        print(f"❌ Batch prediction error: {e}")
+        pred = np.zeros(n, dtype=np.int64)
+    print(f"✅ Binary update: {n} readings, {len(groups)} classrooms")
+
+    # ---------------- Control Logic ----------------
+    ctr = rule_based_control_batch(cols['temp'], cols['solar_kw'], cols['battery_soc'], pred)
+
+    # ---------------- State + Energy Logging ----------------
+    for cls, idx in groups.items():
+        if cls not in LATEST:
+            LATEST[cls] = {"history": []}
+        recs = []
+        timestamps = wire_format.timestamps_to_iso(secs[idx[-48:]])
+        for ts_iso, i in zip(timestamps, idx[-48:]):
+            # float32 on the wire; round so /status shows the sensor's own precision
+            rec = {"timestamp": str(ts_iso), "classroom": cls,
+                   "is_holiday": int(cols['is_holiday'][i]), "scheduled": int(cols['scheduled'][i]),
+                   "occupancy": int(occupancy[i]), "motion": int(cols['motion'][i]),
+                   "temp": round(float(cols['temp'][i]), 4), "co2": round(float(cols['co2'][i]), 4),
+                   "solar_kw": round(float(cols['solar_kw'][i]), 4),
+                   "battery_soc": round(float(cols['battery_soc'][i]), 4),
+                   "hour": int(hour[i]), "dow": int(dow[i]), "occ_lag1": int(occ_lag1[i])}
+            recs.append(rec)
+        LATEST[cls]['history'] = (LATEST[cls]['history'] + recs)[-48:]
+        LATEST[cls]['latest'] = recs[-1]
+        LATEST[cls]['last_update'] = datetime.utcnow().isoformat()
+
+    classroom = np.array(names, dtype=object)[codes]
+    AGGREGATES.add_batch(classroom, secs, pred, occupancy, ctr['total_kwh'], ctr['use_solar'])
+    ENERGY_HISTORY.append({
+        "timestamp": secs,
+        "classroom": classroom,
+        "predicted": pred,
+        "actual": occupancy,
+        **{k: ctr[k] for k in wire_format.ENERGY_FIELDS},
+        "use_solar": ctr['use_solar']
+    })
+
+    resp = dict(ctr, predicted_occupancy=pred)
+    fmt = request.accept_mimetypes.best_match([wire_format.CONTENT_TYPE_JSON, request.mimetype])
+    if fmt == request.mimetype:
+        return app.response_class(wire_format.encode_responses(resp, fmt), mimetype=fmt)
+    out = [wire_format.response_at(resp, i) for i in range(n)]
+    return jsonify(out[0] if request.mimetype == wire_format.CONTENT_TYPE_RECORD else out)
 
 
 # ------------------ Routes ------------------
 @app.route("/update", methods=["POST"])
 def update():
+    if request.mimetype in wire_format.BINARY_CONTENT_TYPES:
+        return update_binary()
+
     j = request.get_json()
     cls = j['classroom']
 
@@ -141,13 +271,17 @@ def update():
     ctr = rule_based_control(rec, pred)
 
     # ---------------- Energy Logging ----------------
+    # wall-clock seconds, same as wire_format.parse_timestamp on the binary path
+    ts_seconds = ts.replace(tzinfo=None).value // 10**9
+    AGGREGATES.add(cls, ts_seconds, pred, rec['occupancy'],
+                   ctr['energy']['total_kwh'], ctr['use_solar'])
     ENERGY_HISTORY.append({
-        "timestamp": rec['timestamp'],
-        "classroom": cls,
-        "predicted": pred,
-        "actual": rec['occupancy'],
-        **ctr['energy'],
-        "use_solar": ctr['use_solar']
+        "timestamp": [ts_seconds],
+        "classroom": [cls],
+        "predicted": [pred],
+        "actual": [rec['occupancy']],
+        **{k: [v] for k, v in ctr['energy'].items()},
+        "use_solar": [ctr['use_solar']]
     })
 
     return jsonify({
@@ -172,8 +306,27 @@ def status():
 
 @app.route("/energy_history", methods=["GET"])
 def energy_hist():
-    """Return last 200 energy history records."""
-    return jsonify(ENERGY_HISTORY[-200:])
+    """Return the last `limit` (default 200) energy history records."""
+    limit = min(request.args.get("limit", 200, type=int), ENERGY_HISTORY.size)
+    return jsonify(ENERGY_HISTORY.tail(limit))
+
+
+@app.route("/analytics/summary", methods=["GET"])
+def analytics_summary():
+    """Campus and per-classroom totals, MAE and solar share over all readings."""
+    return jsonify(AGGREGATES.summary())
+
+
+@app.route("/analytics/series", methods=["GET"])
+def analytics_series():
+    """Bucketed energy series: ?resolution=1h|1d&classroom=<id>&max_points=<n>."""
+    try:
+        return jsonify(AGGREGATES.series_for(
+            resolution=request.args.get("resolution", "1h"),
+            classroom=request.args.get("classroom"),
+            max_points=request.args.get("max_points", 200, type=int)))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
 
 # ------------------ Main ------------------
@@ -2,12 +2,29 @@
 import time, requests, pandas as pd, argparse
 from datetime import datetime
 import math
+import wire_format
 
 SERVER = "http://127.0.0.1:5000"
 DATA_FN = "data/sim_data.csv"
 
-def run(realtime_scale=60.0):
+def post_readings(payloads, fmt):
+    """POST readings to /update in the chosen wire format; returns one response dict per reading."""
+    if fmt == "json":
+        r = requests.post(SERVER + "/update", json=payloads[0], timeout=5)
+        return [r.json()]
+    content_type = wire_format.CONTENT_TYPE_RECORD if fmt == "record" else wire_format.CONTENT_TYPE_BATCH
+    body = wire_format.encode_readings(payloads, content_type)
+    r = requests.post(SERVER + "/update", data=body, timeout=5,
+                      headers={"Content-Type": content_type, "Accept": content_type})
+    r.raise_for_status()
+    cols = wire_format.decode_responses(r.content, content_type)
+    return [wire_format.response_at(cols, i) for i in range(len(payloads))]
+
+def run(realtime_scale=60.0, fmt="json", batch_size=1):
     # realtime_scale: seconds per simulated hour (i.e. 60 => 1 minute per simulated hour)
+    # fmt: "json" (default), "record" (fixed binary struct) or "batch" (columnar, batch_size readings per POST)
+    if fmt != "batch":
+        batch_size = 1
     df = pd.read_csv(DATA_FN)
     # pick classrooms list
     classes = df['classroom'].unique().tolist()
@@ -16,6 +33,7 @@ def run(realtime_scale=60.0):
     battery = {c: 0.5 for c in classes}  # SOC fractional
     # iterate rows in time order
     df = df.sort_values('timestamp')
+    pending = []
     for idx, row in df.iterrows():
         payload = {
             "timestamp": row['timestamp'],
@@ -28,28 +46,40 @@ def run(realtime_scale=60.0):
             "co2": float(row['co2']),
             "solar_kw": float(row['solar_kw']),
         }
-        # add battery info
+        # add battery info (within a batch every reading carries the SOC at batch start)
         payload['battery_soc'] = battery[row['classroom']]
+        pending.append(payload)
+        if len(pending) < batch_size:
+            continue
         try:
-            r = requests.post(SERVER + "/update", json=payload, timeout=5)
-            resp = r.json()
-            # print a short status
-            print(f"[{row['timestamp']} | {row['classroom']}] occ={row['occupancy']}, pred={resp.get('predicted_occupancy')}, devices={resp['control']}, energy={resp['energy']}")
-            # update battery: charge if solar > usage, else discharge
-            produced = payload['solar_kw']
-            used = resp['energy']['total_kwh']
-            net = produced - used
-            # battery capacity normalized 1.0 => store 5 kWh; here net per hour relative
-            # simple SOC update
-            battery[row['classroom']] = min(max(battery[row['classroom']] + net*0.02, 0.0), 1.0)
+            resps = post_readings(pending, fmt)
+            for p, resp in zip(pending, resps):
+                # print a short status
+                print(f"[{p['timestamp']} | {p['classroom']}] occ={p['occupancy']}, pred={resp.get('predicted_occupancy')}, devices={resp['control']}, energy={resp['energy']}")
+                # update battery: charge if solar > usage, else discharge
+                produced = p['solar_kw']
+                used = resp['energy']['total_kwh']
+                net = produced - used
+                # battery capacity normalized 1.0 => store 5 kWh; here net per hour relative
+                # simple SOC update
+                battery[p['classroom']] = min(max(battery[p['classroom']] + net*0.02, 0.0), 1.0)
         except Exception as e:
             print("Error posting:", e)
         # sleep: accelerate time: realtime_scale seconds per simulated hour
-        time.sleep(max(0.05, realtime_scale/3600.0))  # allow small delay
+        time.sleep(max(0.05, len(pending)*realtime_scale/3600.0))  # allow small delay
+        pending = []
+    if pending:
+        try:
+            post_readings(pending, fmt)
+        except Exception as e:
+            print("Error posting:", e)
     print("Simulation finished.")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--scale", type=float, default=60.0, help="seconds per simulated hour")
+    parser.add_argument("--format", choices=["json", "record", "batch"], default="json",
+                        help="wire format for /update (json, fixed binary record, columnar batch)")
+    parser.add_argument("--batch", type=int, default=64, help="readings per POST with --format batch")
     args = parser.parse_args()
-    run(realtime_scale=args.scale)
+    run(realtime_scale=args.scale, fmt=args.format, batch_size=args.batch)
@@ -0,0 +1,202 @@
+# wire_format.py
+# compact binary encodings for sensor readings and control responses
+#
+# Two layouts share the same field schema:
+#   * record: one fixed-layout packed struct (numpy structured dtype), used for
+#     single readings posted with CONTENT_TYPE_RECORD
+#   * batch:  columnar framing used with CONTENT_TYPE_BATCH -- an 8-byte header
+#     (magic, little-endian uint32 count) followed by one contiguous typed array
+#     per field, in schema order
+# Both decode with numpy.frombuffer into a {field: array} dict that the server's
+# binary /update path consumes as columns. JSON stays the default wire format.
+import struct
+from datetime import datetime
+import numpy as np
+
+CONTENT_TYPE_JSON = "application/json"
+CONTENT_TYPE_RECORD = "application/x-classroom-record"
+CONTENT_TYPE_BATCH = "application/x-classroom-batch"
+BINARY_CONTENT_TYPES = (CONTENT_TYPE_RECORD, CONTENT_TYPE_BATCH)
+
+BATCH_MAGIC = b"SCB1"
+BATCH_HEADER = struct.Struct("<4sI")
+
+CLASSROOM_LEN = 16  # bytes reserved for the classroom id (ascii, NUL padded)
+
+# timestamp is wall-clock seconds since the epoch: any UTC offset in the source
+# ISO string is dropped (see parse_timestamp), matching pd.to_datetime's hour/dow
+READING_DTYPE = np.dtype([
+    ("timestamp", "<i8"),
+    ("classroom", f"S{CLASSROOM_LEN}"),
+    ("is_holiday", "u1"),
+    ("scheduled", "u1"),
+    ("motion", "u1"),
+    ("occupancy", "<u2"),
+    ("temp", "<f4"),
+    ("co2", "<f4"),
+    ("solar_kw", "<f4"),
+    ("battery_soc", "<f4"),
+])
+
+RESPONSE_DTYPE = np.dtype([
+    ("predicted_occupancy", "<u2"),
+    ("lights", "u1"),
+    ("fan", "u1"),
+    ("ac", "u1"),
+    ("use_solar", "u1"),
+    ("ac_power_kw", "<f4"),
+    ("lights_kwh", "<f4"),
+    ("fan_kwh", "<f4"),
+    ("ac_kwh", "<f4"),
+    ("total_kwh", "<f4"),
+])
+
+# struct mirror of READING_DTYPE for packing one reading without numpy overhead
+READING_STRUCT = struct.Struct(f"<q{CLASSROOM_LEN}sBBBHffff")
+assert READING_STRUCT.size == READING_DTYPE.itemsize
+
+READING_VALUE_FIELDS = READING_DTYPE.names[2:]  # everything after timestamp, classroom
+_EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+
+DEVICE_FIELDS = ("lights", "fan", "ac", "ac_power_kw")
+ENERGY_FIELDS = ("lights_kwh", "fan_kwh", "ac_kwh", "total_kwh")
+
+
+# ------------------ Generic encode / decode ------------------
+def encode_record(columns, dtype):
+    """Pack columns holding exactly one value each into a fixed-layout record."""
+    arr = np.zeros(1, dtype=dtype)
+    for name in dtype.names:
+        arr[name] = columns[name]
+    return arr.tobytes()
+
+
+def decode_record(body, dtype):
+    """Decode one fixed-layout record into {field: length-1 array}."""
+    if len(body) != dtype.itemsize:
+        raise ValueError(f"record must be {dtype.itemsize} bytes, got {len(body)}")
+    arr = np.frombuffer(body, dtype=dtype)
+    return {name: arr[name] for name in dtype.names}
+
+
+def encode_batch(columns, dtype):
+    """Encode {field: array} as a columnar batch (header + one array per field)."""
+    count = len(columns[dtype.names[0]])
+    parts = [BATCH_HEADER.pack(BATCH_MAGIC, count)]
+    for name in dtype.names:
+        col = np.asarray(columns[name], dtype=dtype.fields[name][0])
+        if len(col) != count:
+            raise ValueError(f"column '{name}' has {len(col)} values, expected {count}")
+        parts.append(col.tobytes())
+    return b"".join(parts)
+
+
+def decode_batch(body, dtype):
+    """Decode a columnar batch into {field: array} without copying the payload."""
+    if len(body) < BATCH_HEADER.size:
+        raise ValueError("batch too short for header")
+    magic, count = BATCH_HEADER.unpack_from(body)
+    if magic != BATCH_MAGIC:
+        raise ValueError(f"bad batch magic {magic!r}")
+    expected = BATCH_HEADER.size + count * dtype.itemsize
+    if len(body) != expected:
+        raise ValueError(f"batch of {count} must be {expected} bytes, got {len(body)}")
+    columns = {}
+    offset = BATCH_HEADER.size
+    for name in dtype.names:
+        field_dtype = dtype.fields[name][0]
+        columns[name] = np.frombuffer(body, dtype=field_dtype, count=count, offset=offset)
+        offset += count * field_dtype.itemsize
+    return columns
+
+
+def encode(columns, dtype, content_type):
+    if content_type == CONTENT_TYPE_RECORD:
+        return encode_record(columns, dtype)
+    if content_type == CONTENT_TYPE_BATCH:
+        return encode_batch(columns, dtype)
+    raise ValueError(f"unsupported content type: {content_type}")
+
+
+def decode(body, dtype, content_type):
+    if content_type == CONTENT_TYPE_RECORD:
+        return decode_record(body, dtype)
+    if content_type == CONTENT_TYPE_BATCH:
+        return decode_batch(body, dtype)
+    raise ValueError(f"unsupported content type: {content_type}")
+
+
+# ------------------ Sensor readings ------------------
+def parse_timestamp(ts):
+    """
+    ISO timestamp -> wall-clock epoch seconds. A UTC offset is stripped rather
+    than converted, so hour/dow match the JSON path (pd.to_datetime keeps the
+    local hour).
+    """
+    dt = datetime.fromisoformat(ts)
+    # plain arithmetic on the wall-clock fields; ~4x cheaper than dt.timestamp()
+    return (dt.toordinal() - _EPOCH_ORDINAL) * 86400 + dt.hour * 3600 + dt.minute * 60 + dt.second
+
+
+def readings_to_columns(readings):
+    """Convert a list of /update JSON payloads into {field: array} columns."""
+    for r in readings:
+        if len(r['classroom']) > CLASSROOM_LEN:
+            raise ValueError(f"classroom id longer than {CLASSROOM_LEN} bytes: {r['classroom']!r}")
+    columns = {
+        "timestamp": np.array([parse_timestamp(r['timestamp']) for r in readings], dtype=np.int64),
+        "classroom": np.array([r['classroom'].encode("ascii") for r in readings],
+                              dtype=READING_DTYPE.fields['classroom'][0]),
+    }
+    for name in READING_VALUE_FIELDS:
+        columns[name] = np.array([r.get(name) or 0 for r in readings],
+                                 dtype=READING_DTYPE.fields[name][0])
+    return columns
+
+
+def encode_readings(readings, content_type=CONTENT_TYPE_BATCH):
+    """Encode /update payload dicts; a record body must hold exactly one reading."""
+    if content_type == CONTENT_TYPE_RECORD:
+        if len(readings) != 1:
+            raise ValueError("record format carries exactly one reading")
+        return encode_reading(readings[0])
+    return encode(readings_to_columns(readings), READING_DTYPE, content_type)
+
+
+def encode_reading(r):
+    """Pack a single /update payload dict into a fixed-layout record."""
+    cls = r['classroom'].encode("ascii")
+    if len(cls) > CLASSROOM_LEN:
+        raise ValueError(f"classroom id longer than {CLASSROOM_LEN} bytes: {r['classroom']!r}")
+    return READING_STRUCT.pack(parse_timestamp(r['timestamp']), cls,
+                               *[r.get(name) or 0 for name in READING_VALUE_FIELDS])
+
+
+def decode_readings(body, content_type):
+    return decode(body, READING_DTYPE, content_type)
+
+
+def timestamps_to_iso(seconds):
+    """Epoch seconds -> ISO strings matching datetime.isoformat() of the source."""
+    return np.datetime_as_string(np.asarray(seconds).astype("datetime64[s]"), unit="s")
+
+
+# ------------------ Control responses ------------------
+def encode_responses(columns, content_type):
+    return encode(columns, RESPONSE_DTYPE, content_type)
+
+
+def decode_responses(body, content_type):
+    return decode(body, RESPONSE_DTYPE, content_type)
+
+
+def response_at(columns, i):
+    """Rebuild the JSON-shaped /update response for reading i of a decoded batch."""
+    # float32 on the wire; round back to the precision the controller produces
+    return {
+        "predicted_occupancy": int(columns['predicted_occupancy'][i]),
+        "control": {k: (round(float(columns[k][i]), 4) if k == "ac_power_kw" else int(columns[k][i]))
+                    for k in DEVICE_FIELDS},
+        "energy": {k: round(float(columns[k][i]), 4) for k in ENERGY_FIELDS},
+        "use_solar": bool(columns['use_solar'][i]),
+    }